@@ -0,0 +1,76 @@
+import argparse
+import threading
+import time
+from src.routing import Router, RoutingGraph, ShardedRouter
+
+
+NOTE_ON = 0x90
+
+
+def heavy_udf(msg):
+    # Stand-in for an expensive Python process node
+    acc = 0
+    for i in range(2000):
+        acc += i * msg[1]
+    return [msg[0], msg[1], (msg[2] + acc) % 128]
+
+
+def build_patch(ports):
+    graph = RoutingGraph()
+    for port in ports:
+        src = graph.add_node("input", port)
+        process = graph.add_node("process", func=heavy_udf)
+        dst = graph.add_node("output", "out")
+        graph.connect(src, process)
+        graph.connect(process, dst)
+    return graph
+
+
+def run(router_cls, ports, messages):
+    received = 0
+    done = threading.Event()
+    total = len(ports) * messages
+
+    def writer(port, msg):
+        nonlocal received
+        received += 1
+        if received == total:
+            done.set()
+
+    router = router_cls(writer)
+    router.load(build_patch(ports))
+    # Spawned workers still have to boot and unpickle the patch - keep that out of the timing
+    if not router.wait_ready(timeout=30):
+        print("Workers did not start, sharded figures include in-process fallback")
+
+    # One feeding thread per port, like one rtmidi callback thread per controller
+    def feed(port):
+        for i in range(messages):
+            router.dispatch(port, [NOTE_ON, i % 128, 100])
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=feed, args=(port,)) for port in ports]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    done.wait(timeout=120)
+    elapsed = time.perf_counter() - start
+    router.close()
+    return received, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare single-process and sharded routing on the same patch")
+    parser.add_argument("--ports", type=int, default=4)
+    parser.add_argument("--messages", type=int, default=2000)
+    args = parser.parse_args()
+
+    ports = [f"controller {i + 1}" for i in range(args.ports)]
+    for label, router_cls in (("single-process", Router), ("sharded", ShardedRouter)):
+        received, elapsed = run(router_cls, ports, args.messages)
+        print(f"{label:>15}: {received} messages in {elapsed:.3f}s ({received / elapsed:,.0f} msg/s)")
+
+
+if __name__ == "__main__":
+    main()
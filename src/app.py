@@ -1,7 +1,10 @@
 from PySide6.QtWidgets import QWidget, QVBoxLayout, QFormLayout, QLabel, QTextEdit, QComboBox
 from PySide6.QtGui import QIcon, QTextCursor
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, QTimer
+from src.keystroke import KeystrokeSink, create_backend
 from src.midi_handler import MidiHandler
+from src.routing import Router, ShardedRouter
+from src.sysex import SYSEX_START, format_sysex
 from src.node_graph.widget import NodeGraphWidget
 
 
@@ -10,6 +13,9 @@ class MidiMonitor(QWidget):
         super().__init__()
 
         self.midi_handler = MidiHandler(callback=self.midi_callback)
+        backend = create_backend()
+        self.keystroke_sink = KeystrokeSink(backend) if backend is not None else None
+        self.router = Router(writer=self.route_output, keystroke_sink=self.keystroke_sink)
 
         self.setWindowTitle("MIDI Mapper")
         self.setWindowIcon(QIcon("resources/icon.png"))
@@ -35,6 +41,19 @@ class MidiMonitor(QWidget):
         self.output_combo.currentIndexChanged.connect(self.change_midi_output)
         form_layout.addRow(QLabel("MIDI Output:"), self.output_combo)
 
+        self.execution_combo = QComboBox()
+        self.execution_combo.addItems(["Single process", "Worker per input port"])
+        self.execution_combo.setMaximumWidth(300)
+        self.execution_combo.currentIndexChanged.connect(self.change_execution_mode)
+        form_layout.addRow(QLabel("Execution:"), self.execution_combo)
+
+        self.keystroke_label = QLabel("unavailable" if self.keystroke_sink is None else "")
+        form_layout.addRow(QLabel("Keystrokes:"), self.keystroke_label)
+        if self.keystroke_sink is not None:
+            self.keystroke_timer = QTimer(self)
+            self.keystroke_timer.timeout.connect(self.update_keystroke_stats)
+            self.keystroke_timer.start(1000)
+
         main_layout.addLayout(form_layout)
         main_layout.addSpacing(20)
 
@@ -51,9 +70,16 @@ class MidiMonitor(QWidget):
         main_layout.addSpacing(20)
 
         self.node_graph = NodeGraphWidget()
+        self.node_graph.node_view.graph_changed.connect(self.reload_routing)
+        self.node_graph.node_view.stats_source = lambda: self.router.snapshot()
         main_layout.addWidget(self.node_graph)
 
     def midi_callback(self, msg, timestamp):
+        if msg[0] == SYSEX_START or msg[0] < 0x80:
+            # SysEx start, or a continuation fragment of a dump in progress
+            self.sysex_callback(msg)
+            return
+
         event_type, control, val = msg[0], msg[1], msg[2]
         status_hex = f"{event_type:02X}"
         message_str = f"Status: 0x{status_hex}, Data1: {control}, Data2: {val}"
@@ -63,11 +89,54 @@ class MidiMonitor(QWidget):
 
         # Auto-scroll to the latest message
         self.message_display.moveCursor(QTextCursor.End)
-        self.midi_handler.midi_out.send_message(msg)
+
+        if self.router.has_inputs():
+            self.router.dispatch(self.midi_handler.midi_in_name, msg)
+        else:
+            self.midi_handler.send_message(msg)
+
+    def route_output(self, port, msg):
+        # Only the output selected in the monitor is open for now
+        self.midi_handler.send_message(msg)
+
+    def reload_routing(self):
+        graph = self.node_graph.node_view.build_routing_graph(default_input=self.midi_handler.midi_in_name)
+        self.router.load(graph)
+
+    def change_execution_mode(self, index):
+        self.router.close()
+        router_cls = ShardedRouter if index == 1 else Router
+        self.router = router_cls(writer=self.route_output, keystroke_sink=self.keystroke_sink)
+        self.reload_routing()
+
+    def sysex_callback(self, msg):
+        # Single copy out of rtmidi's list - everything downstream works on views of it
+        data = self.midi_handler.receive_sysex(bytes(msg))
+        if data is None:
+            return
+
+        self.message_display.append(format_sysex(data))
+        self.message_display.moveCursor(QTextCursor.End)
+
+        if self.router.has_inputs():
+            self.router.dispatch(self.midi_handler.midi_in_name, data)
+        else:
+            self.midi_handler.send_message(data)
+
+    def update_keystroke_stats(self):
+        rate, mean, peak = self.keystroke_sink.report()
+        self.keystroke_label.setText(f"{rate:.0f} events/s, latency {mean:.2f} ms avg / {peak:.2f} ms max")
+
+    def closeEvent(self, event):
+        self.router.close()
+        if self.keystroke_sink is not None:
+            self.keystroke_sink.close()
+        super().closeEvent(event)
 
     def change_midi_input(self, index):
         port_name = self.input_combo.itemText(index)
         self.midi_handler.set_midi_in(port_name)
+        self.reload_routing()
 
     def change_midi_output(self, index):
         port_name = self.output_combo.itemText(index)
@@ -0,0 +1,197 @@
+import os
+import struct
+import sys
+import threading
+import time
+
+
+EV_SYN = 0x00
+EV_KEY = 0x01
+SYN_REPORT = 0
+
+NOTE_OFF = 0x80
+NOTE_ON = 0x90
+CONTROL_CHANGE = 0xB0
+
+INPUT_EVENT = struct.Struct("llHHi")  # struct input_event: timeval, type, code, value
+
+
+def key_events(msg, keys):
+    # Pads and buttons map to key combos: press in order, release in reverse
+    if len(msg) < 3:
+        return ()
+    combo = keys.get(msg[1])
+    if not combo:
+        return ()
+
+    status = msg[0] & 0xF0
+    if status == NOTE_ON and msg[2] > 0:
+        pressed = True
+    elif status in (NOTE_ON, NOTE_OFF):
+        pressed = False
+    elif status == CONTROL_CHANGE:
+        pressed = msg[2] >= 64
+    else:
+        return ()
+
+    if pressed:
+        return [(code, 1) for code in combo]
+    return [(code, 0) for code in reversed(combo)]
+
+
+def resolve_key(name):
+    # Key codes can be given as numbers or evdev names such as KEY_LEFTCTRL
+    name = name.strip()
+    if name.isdigit():
+        return int(name)
+    try:
+        from evdev import ecodes
+    except ImportError:
+        raise ValueError(f"Key name {name} needs the evdev package, use a numeric key code")
+    if name not in ecodes.ecodes:
+        raise ValueError(f"Unknown key {name}")
+    return ecodes.ecodes[name]
+
+
+def parse_key_map(text):
+    # "36=KEY_LEFTCTRL+KEY_S, 37=57" -> {36: (29, 31), 37: (57,)}
+    keys = {}
+    for entry in text.split(","):
+        if not entry.strip():
+            continue
+        number, sep, combo = entry.partition("=")
+        if not sep or not number.strip().isdigit() or not combo.strip():
+            raise ValueError(f"Expected <note/CC>=<key>+<key>, got '{entry.strip()}'")
+        keys[int(number)] = tuple(resolve_key(key) for key in combo.split("+"))
+    return keys
+
+
+def format_key_map(keys):
+    return ", ".join(f"{number}={'+'.join(str(code) for code in combo)}" for number, combo in sorted(keys.items()))
+
+
+class MemoryBackend:
+    # Stand-in for the virtual device, keeps every batch it is given
+    def __init__(self):
+        self.batches = []
+
+    @property
+    def events(self):
+        return [event for batch in self.batches for event in batch]
+
+    def write(self, events):
+        self.batches.append(list(events))
+
+    def close(self):
+        pass
+
+
+class UinputBackend:
+    def __init__(self, name="MIDI Mapper Keyboard"):
+        from evdev import UInput  # Optional, only needed for the real device
+        self.device = UInput(name=name)
+
+    def write(self, events):
+        # The whole batch goes to the kernel in a single write
+        data = bytearray()
+        for code, value in events:
+            data += INPUT_EVENT.pack(0, 0, EV_KEY, code, value)
+            data += INPUT_EVENT.pack(0, 0, EV_SYN, SYN_REPORT, 0)
+        os.write(self.device.fd, data)
+
+    def close(self):
+        self.device.close()
+
+
+def create_backend():
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        return UinputBackend()
+    except ImportError:
+        print("Keystroke output needs the evdev package")
+    except Exception as e:
+        # evdev raises UInputError when /dev/uinput is missing or root-only
+        print(f"Keystroke output unavailable, could not open /dev/uinput: {e}")
+    return None
+
+
+class KeystrokeSink:
+    def __init__(self, backend):
+        self.backend = backend
+        self.pending = []
+        self.pending_since = None
+        self.lock = threading.Lock()  # Routing writes and the tick flush can be on different threads
+        self.held = {}  # id(key map) -> (key map, pressed codes in press order)
+
+        self.events_written = 0
+        self.batches_written = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.last_report = (time.perf_counter(), 0, 0, 0.0)
+
+    def write(self, keys, msg):
+        events = key_events(msg, keys)
+        if events:
+            with self.lock:
+                pressed = self.held.setdefault(id(keys), (keys, {}))[1]
+                for code, value in events:
+                    if value:
+                        pressed[code] = None
+                    else:
+                        pressed.pop(code, None)
+                self.queue(events)
+
+    def queue(self, events):
+        if not self.pending:
+            self.pending_since = time.perf_counter()
+        self.pending.extend(events)
+
+    def release_except(self, key_maps):
+        # Queues releases for keys held by nodes that are no longer in the patch
+        keep = {id(keys) for keys in key_maps}
+        with self.lock:
+            for owner in [owner for owner in self.held if owner not in keep]:
+                pressed = self.held.pop(owner)[1]
+                if pressed:
+                    self.queue([(code, 0) for code in reversed(pressed)])
+
+    def release_all(self):
+        self.release_except(())
+
+    def flush(self):
+        # Called once per routing tick
+        with self.lock:
+            if not self.pending:
+                return
+            events, self.pending = self.pending, []
+            since = self.pending_since
+        try:
+            self.backend.write(events)
+        except OSError as e:
+            print(f"Keystroke write failed: {e}")
+            return
+
+        latency = time.perf_counter() - since
+        self.events_written += len(events)
+        self.batches_written += 1
+        self.latency_total += latency
+        if latency > self.latency_max:
+            self.latency_max = latency
+
+    def report(self):
+        # Events/sec and mean/max sink latency (ms) since the previous report
+        now = time.perf_counter()
+        then, events, batches, latency_total = self.last_report
+        self.last_report = (now, self.events_written, self.batches_written, self.latency_total)
+
+        batch_count = self.batches_written - batches
+        rate = (self.events_written - events) / max(now - then, 1e-6)
+        mean = (self.latency_total - latency_total) / batch_count * 1000 if batch_count else 0.0
+        peak, self.latency_max = self.latency_max * 1000, 0.0
+        return rate, mean, peak
+
+    def close(self):
+        self.release_all()
+        self.flush()
+        self.backend.close()
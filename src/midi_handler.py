@@ -1,14 +1,26 @@
+import threading
 import rtmidi2 as rt
 import mido
+from src.sysex import SysexAssembler, SysexStreamer, SYSEX_BYTES_PER_SECOND, is_sysex
 
 
 class MidiHandler:
-    def __init__(self, callback):
+    def __init__(self, callback, sysex_rate=SYSEX_BYTES_PER_SECOND):
         self.midi_in = rt.MidiIn()
         self.midi_out = rt.MidiOut()
         self.midi_in.callback = callback
         self.midi_in_name = ""
         self.midi_out_name = ""
+
+        # SysEx is ignored by rtmidi by default - let dumps through and pace them on the way out
+        self.midi_in.ignore_types(midi_sysex=False)
+        self.out_lock = threading.Lock()
+        self.sysex_assembler = SysexAssembler()
+        self.sysex_streamer = SysexStreamer(
+            self.midi_out.send_message,
+            self.out_lock,
+            bytes_per_second=sysex_rate
+        )
         self.initialise()
 
     def initialise(self):
@@ -82,6 +94,19 @@ class MidiHandler:
             print(f"Output port {output_name} could not be opened - it may be in use by another program.")
             return None
 
+    def receive_sysex(self, data):
+        return self.sysex_assembler.feed(data)
+
+    def set_sysex_rate(self, bytes_per_second):
+        self.sysex_streamer.set_rate(bytes_per_second)
+
+    def send_message(self, msg):
+        if is_sysex(msg):
+            self.sysex_streamer.stream(msg)
+            return
+        with self.out_lock:
+            self.midi_out.send_message(msg)
+
     def send_timing_clock(self):
         self.midi_out.send_raw(rt.TIMING_CLOCK)
 
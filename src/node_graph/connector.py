@@ -1,10 +1,15 @@
 from PySide6.QtWidgets import QGraphicsItem
-from PySide6.QtCore import QPointF, QRectF
-from PySide6.QtGui import QPen, QPainterPath, QColor
+from PySide6.QtCore import Qt, QPointF, QRectF
+from PySide6.QtGui import QPen, QPainterPath, QColor, QFont
+from src.routing import format_message
 
 
 CONNECTION_COLOR = QColor(200, 200, 200)
 CONNECTION_COLOR_SELECTED = QColor(255, 255, 100)
+CONNECTION_COLOR_ACTIVE = QColor(255, 100, 100)
+READOUT_COLOR = QColor(220, 220, 220)
+READOUT_MARGIN = 60  # Room around the curve for the value readout
+ACTIVITY_DECAY = 0.75
 
 
 class Connection(QGraphicsItem):
@@ -13,6 +18,11 @@ class Connection(QGraphicsItem):
         self.start_socket = start_socket
         self.end_socket = end_socket
         self.end_pos = QPointF(0, 0)
+        self.route_index = None  # Edge index in the compiled routing graph
+        self.message_count = 0
+        self.activity = 0.0
+        self.rate = 0
+        self.readout = ""
         self.setZValue(-1)  # Draw connections behind nodes
 
     def boundingRect(self):
@@ -23,7 +33,7 @@ class Connection(QGraphicsItem):
         start = self.mapFromScene(start)
         end = self.mapFromScene(end)
 
-        return QRectF(start, end).normalized().adjusted(-10, -10, 10, 10)
+        return QRectF(start, end).normalized().adjusted(-READOUT_MARGIN, -READOUT_MARGIN, READOUT_MARGIN, READOUT_MARGIN)
 
     def paint(self, painter, option, widget):
         start = self.start_socket.get_connection_point()
@@ -49,10 +59,38 @@ class Connection(QGraphicsItem):
         if self.isSelected():
             pen.setColor(CONNECTION_COLOR_SELECTED)
             pen.setWidth(4)
+        elif self.activity > 0:
+            pen.setColor(blend(CONNECTION_COLOR, CONNECTION_COLOR_ACTIVE, self.activity))
+            pen.setWidthF(3 + 2 * self.activity)
 
         painter.setPen(pen)
         painter.drawPath(path)
 
+        # Value readout at the midpoint of the curve
+        if self.readout:
+            painter.setPen(QPen(READOUT_COLOR))
+            painter.setFont(QFont("JetBrains Mono", 8))
+            mid = path.pointAtPercent(0.5)
+            text = f"{self.readout}  {self.rate}/s" if self.rate else self.readout
+            painter.drawText(QRectF(mid.x() - READOUT_MARGIN, mid.y() - 20, READOUT_MARGIN * 2, 16), Qt.AlignCenter, text)
+
+    def set_activity(self, count, value, elapsed):
+        # Called at the sampling frame rate, never per message - elapsed is the measured time since the last sample
+        delta = count - self.message_count if count >= self.message_count else count
+        self.message_count = count
+        readout = format_message(value) if value else ""
+        rate = round(delta / elapsed) if elapsed > 0 else self.rate
+
+        activity = 1.0 if delta else self.activity * ACTIVITY_DECAY
+        if activity < 0.05:
+            activity = 0.0
+
+        if activity != self.activity or readout != self.readout or rate != self.rate:
+            self.activity = activity
+            self.readout = readout
+            self.rate = rate
+            self.update()
+
     def set_end_pos(self, pos):
         self.end_pos = pos
         self.prepareGeometryChange()
@@ -69,4 +107,12 @@ class Connection(QGraphicsItem):
         if self.start_socket:
             self.start_socket.remove_connection(self)
         if self.end_socket:
-            self.end_socket.remove_connection(self)
\ No newline at end of file
+            self.end_socket.remove_connection(self)
+
+
+def blend(a, b, t):
+    return QColor(
+        int(a.red() + (b.red() - a.red()) * t),
+        int(a.green() + (b.green() - a.green()) * t),
+        int(a.blue() + (b.blue() - a.blue()) * t)
+    )
@@ -1,6 +1,9 @@
-from PySide6.QtWidgets import QGraphicsView, QGraphicsScene, QMenu
+import time
+from PySide6.QtWidgets import QGraphicsView, QGraphicsScene, QMenu, QInputDialog, QMessageBox
 from PySide6.QtGui import QPen, QPainter, QColor
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, Signal, QTimer
+from src.keystroke import format_key_map, parse_key_map
+from src.routing import RoutingGraph
 from src.node_graph.socket import Socket
 from src.node_graph.node import Node
 from src.node_graph.connector import Connection
@@ -8,12 +11,15 @@ from src.node_graph.connector import Connection
 
 CANVAS_BACKGROUND = QColor(35, 35, 35)
 GRID_COLOR = QColor(60, 60, 60, 150)
+ACTIVITY_FPS = 15
 
 
 class NodeGraphView(QGraphicsView):
+    graph_changed = Signal()
+
     def __init__(self):
         super().__init__()
-        self.node_count = {"input": 0, "process": 0, "output": 0}
+        self.node_count = {"input": 0, "process": 0, "output": 0, "keystroke": 0}
         self.scene = QGraphicsScene()
         self.setScene(self.scene)
 
@@ -36,6 +42,14 @@ class NodeGraphView(QGraphicsView):
         self.grid_size = 50
         self.show_grid = True
 
+        # Signal flow - routing stats are sampled at a fixed rate, independent of message rate
+        self.stats_source = None  # Callable returning [(count, last value)] per routed connection
+        self.route_connections = []
+        self.last_sample = time.perf_counter()
+        self.activity_timer = QTimer(self)
+        self.activity_timer.timeout.connect(self.sample_activity)
+        self.activity_timer.start(1000 // ACTIVITY_FPS)
+
     def drawBackground(self, painter, rect):
         # Draw dark background
         painter.fillRect(rect, CANVAS_BACKGROUND)
@@ -137,6 +151,7 @@ class NodeGraphView(QGraphicsView):
             item = self.itemAt(event.position().toPoint())
             if isinstance(item, Socket) and self.can_connect(self.connection_start_socket, item):
                 self.temp_connection.connect_to_socket(item)
+                self.graph_changed.emit()
             else:
                 # Cancel connection - safely remove from scene
                 self.cancel_connection()
@@ -163,6 +178,8 @@ class NodeGraphView(QGraphicsView):
                             connection.disconnect()
                             self.scene.removeItem(connection)
                     self.scene.removeItem(item)
+            if selected_items:
+                self.graph_changed.emit()
         elif event.key() == Qt.Key_G:
             # Toggle grid
             self.show_grid = not self.show_grid
@@ -205,10 +222,69 @@ class NodeGraphView(QGraphicsView):
         node.setPos(pos)
         self.scene.addItem(node)
         self.node_count[node_type] += 1
+        self.graph_changed.emit()
+
+    def sample_activity(self):
+        now = time.perf_counter()
+        elapsed, self.last_sample = now - self.last_sample, now
+        if self.stats_source is None or not self.route_connections:
+            return
+        snapshot = self.stats_source()
+        for connection in self.route_connections:
+            if connection.route_index < len(snapshot):
+                count, value = snapshot[connection.route_index]
+                connection.set_activity(count, value, elapsed)
+
+    def edit_key_map(self, node):
+        text, ok = QInputDialog.getText(
+            self,
+            "Key Map",
+            "Note/CC number = key codes, e.g. 36=KEY_LEFTCTRL+KEY_S, 37=57",
+            text=format_key_map(node.keys)
+        )
+        if not ok:
+            return
+        try:
+            node.keys = parse_key_map(text)
+        except ValueError as e:
+            QMessageBox.warning(self, "Key Map", str(e))
+            return
+        node.update()
+        self.graph_changed.emit()
+
+    def build_routing_graph(self, default_input=None):
+        graph = RoutingGraph()
+        self.route_connections = []
+        indices = {}
+        for item in self.scene.items():
+            if isinstance(item, Node):
+                port = item.port_name
+                if port is None and item.type == "input":
+                    port = default_input
+                indices[item] = graph.add_node(item.type, port, item.func, item.keys)
+
+        for item in self.scene.items():
+            if isinstance(item, Connection) and item.end_socket is not None:
+                # Connections can be dragged in either direction
+                src, dst = item.start_socket, item.end_socket
+                if src.socket_type == "input":
+                    src, dst = dst, src
+                item.route_index = graph.connect(indices[src.node], indices[dst.node])
+                item.message_count = 0
+                self.route_connections.append(item)
+        return graph
 
     def show_context_menu(self, pos):
         menu = QMenu(self)
 
+        # Keystroke node key map
+        item = self.itemAt(pos)
+        node = item if isinstance(item, Node) else getattr(item, "node", None)
+        if isinstance(node, Node) and node.type == "keystroke":
+            key_map_action = menu.addAction("Edit Key Map...")
+            key_map_action.triggered.connect(lambda: self.edit_key_map(node))
+            menu.addSeparator()
+
         # Add node action
         add_node_action = menu.addAction("Add Node")
         add_node_action.triggered.connect(
@@ -21,6 +21,9 @@ class Node(QGraphicsItem):
         self.width = width
         self.height = height
         self.type = node_type
+        self.port_name = None  # None routes to/from the ports selected in the monitor
+        self.func = None  # Process node UDF, msg -> msg or None to drop
+        self.keys = {}  # Keystroke node map, note/CC number -> key codes
         self.input_sockets = []
         self.output_sockets = []
 
@@ -29,7 +32,7 @@ class Node(QGraphicsItem):
         self.setFlag(QGraphicsItem.ItemSendsGeometryChanges, True)
 
         # Create default sockets
-        if self.type in ("output", "process"):
+        if self.type in ("output", "process", "keystroke"):
             self.add_input_socket()
 
         if self.type in ("process", "input"):
@@ -75,6 +78,13 @@ class Node(QGraphicsItem):
         painter.setFont(font)
         painter.drawText(title_rect, Qt.AlignCenter, self.title)
 
+        # Keystroke nodes show their mapping state
+        if self.type == "keystroke":
+            painter.setFont(QFont("JetBrains Mono", 8))
+            body_rect = QRectF(0, 25, self.width, self.height - 25)
+            hint = f"{len(self.keys)} keys mapped" if self.keys else "Right-click to map keys"
+            painter.drawText(body_rect, Qt.AlignCenter, hint)
+
     def add_input_socket(self):
         socket = Socket(self, "input", len(self.input_sockets))
         socket.setParentItem(self)
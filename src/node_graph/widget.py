@@ -24,6 +24,10 @@ class NodeGraphWidget(QWidget):
         add_out_node_btn.clicked.connect(self.add_output_node)
         toolbar_layout.addWidget(add_out_node_btn)
 
+        add_key_node_btn = QPushButton("Add Keystroke Node")
+        add_key_node_btn.clicked.connect(self.add_keystroke_node)
+        toolbar_layout.addWidget(add_key_node_btn)
+
         clear_btn = QPushButton("Clear All")
         clear_btn.clicked.connect(self.clear_all)
         toolbar_layout.addWidget(clear_btn)
@@ -48,6 +52,12 @@ class NodeGraphWidget(QWidget):
         center = self.node_view.mapToScene(self.node_view.rect().center())
         self.node_view.create_node_at_position(center, "output")
 
+    def add_keystroke_node(self):
+        center = self.node_view.mapToScene(self.node_view.rect().center())
+        self.node_view.create_node_at_position(center, "keystroke")
+
     def clear_all(self):
         self.node_view.scene.clear()
-        self.node_view.node_count = {"input": 0, "process": 0, "output": 0}
+        self.node_view.route_connections = []
+        self.node_view.node_count = {"input": 0, "process": 0, "output": 0, "keystroke": 0}
+        self.node_view.graph_changed.emit()
@@ -0,0 +1,554 @@
+import multiprocessing as mp
+import platform
+import queue
+import struct
+import threading
+import time
+from multiprocessing import shared_memory
+
+
+RING_CAPACITY = 4096
+RING_HEADER_SIZE = 16  # head (messages written), tail (messages read) as native uint64
+RING_SLOT = struct.Struct("<HB3Bxx")  # route, length, up to three MIDI bytes
+STATS_CELL = 8  # One uint64 for the count and one for the last value, per connection
+
+IDLE_SPINS = 200
+IDLE_SLEEP = 0.0002
+HEALTH_CHECK_INTERVAL = 0.1
+DISPATCH_TIMEOUT = 0.05  # Longest a full ring may block the callback thread
+ROUTING_TICK = 0.005  # In-process batched sinks flush at this interval
+
+# The ring publishes head with a plain store after writing the slot, which relies on
+# x86 store ordering. Other CPUs (e.g. ARM) use a multiprocessing queue instead.
+SHARED_RING_SAFE = platform.machine().lower() in ("x86_64", "amd64", "x86", "i386", "i686")
+
+OUTPUT_KINDS = ("output", "keystroke")
+
+
+class RouteNode:
+    def __init__(self, kind, port=None, func=None, keys=None):
+        self.kind = kind  # "input", "process", "output" or "keystroke"
+        self.port = port
+        self.func = func
+        self.keys = keys  # Keystroke nodes: note/CC number -> key codes
+        self.targets = []  # (edge index, node index)
+
+
+class RoutingGraph:
+    def __init__(self):
+        self.nodes = []
+        self.edges = []
+        self.inputs = {}  # input port -> input node indices
+
+    def add_node(self, kind, port=None, func=None, keys=None):
+        index = len(self.nodes)
+        self.nodes.append(RouteNode(kind, port, func, keys))
+        if kind == "input":
+            self.inputs.setdefault(port, []).append(index)
+        return index
+
+    def connect(self, src, dst):
+        edge = len(self.edges)
+        self.edges.append((src, dst))
+        self.nodes[src].targets.append((edge, dst))
+        return edge
+
+    def input_ports(self):
+        return list(self.inputs)
+
+
+def pack_message(msg):
+    length = len(msg)
+    if length >= 3:
+        return length << 24 | msg[0] << 16 | msg[1] << 8 | msg[2]
+    value = length << 24
+    for i in range(length):
+        value |= msg[i] << (16 - 8 * i)
+    return value
+
+
+def format_message(value):
+    length = value >> 24
+    data = ((value >> 16) & 0xFF, (value >> 8) & 0xFF, value & 0xFF)[:length]
+    text = " ".join(f"{b:02X}" for b in data)
+    return text if length <= 3 else f"{text} .. ({length} bytes)"
+
+
+class ConnectionStats:
+    # Per-connection message counters and last-value registers. Incrementing is a
+    # plain read-modify-write, so each block must have a single writing thread;
+    # readers may sample at any time. Shared blocks let worker processes record
+    # into memory the GUI can sample.
+    def __init__(self, size, name=None, shared=False):
+        self.size = size
+        self.shm = None
+        self.owner = shared and name is None
+        nbytes = max(1, size) * STATS_CELL * 2
+        if shared or name is not None:
+            self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=nbytes)
+            buf = self.shm.buf
+        else:
+            buf = bytearray(nbytes)
+        self.cells = memoryview(buf)[:size * STATS_CELL * 2].cast("Q")
+        self.counts = self.cells[:size]
+        self.last = self.cells[size:]
+
+    @property
+    def name(self):
+        return self.shm.name if self.shm is not None else None
+
+    def record(self, edge, msg):
+        self.counts[edge] += 1
+        self.last[edge] = pack_message(msg)
+
+    def close(self):
+        self.counts.release()
+        self.last.release()
+        self.cells.release()
+        if self.shm is not None:
+            self.shm.close()
+            if self.owner:
+                self.shm.unlink()
+
+
+def evaluate(graph, port, msg, emit, stats=None):
+    for index in graph.inputs.get(port, ()):
+        propagate(graph, index, msg, emit, len(graph.nodes), stats)
+
+
+def propagate(graph, index, msg, emit, depth, stats):
+    if depth < 0:
+        return  # Cycle in the patch
+
+    node = graph.nodes[index]
+    if node.kind in OUTPUT_KINDS:
+        emit(index, msg)
+        return
+
+    if node.func is not None:
+        try:
+            msg = node.func(msg)
+        except Exception as e:
+            print(f"Process node {index} raised {e!r}, dropping message")
+            return
+        if msg is None:
+            return
+
+    for edge, target in node.targets:
+        if stats is not None:
+            stats.record(edge, msg)
+        propagate(graph, target, msg, emit, depth - 1, stats)
+
+
+class MessageRing:
+    # Single-producer, single-consumer ring of short MIDI messages in shared memory.
+    # The producer only ever writes head and the consumer only ever writes tail.
+    # There is no memory barrier between the slot and head stores - x86 only,
+    # see SHARED_RING_SAFE.
+    def __init__(self, capacity=RING_CAPACITY, name=None):
+        self.capacity = capacity
+        self.owner = name is None
+        size = RING_HEADER_SIZE + capacity * RING_SLOT.size
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=size)
+        self.buf = self.shm.buf
+        # Indexing a cast view is a single aligned 8-byte load/store; struct packs
+        # byte by byte, which lets the other side read a torn counter
+        self.header = self.buf[:RING_HEADER_SIZE].cast("Q")
+        if self.owner:
+            self.header[0] = 0
+            self.header[1] = 0
+
+    def __reduce__(self):
+        # Workers attach to the existing block by name
+        return MessageRing, (self.capacity, self.shm.name)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @staticmethod
+    def fits(msg):
+        return len(msg) <= 3
+
+    def push(self, route, msg):
+        head = self.header[0]
+        if head - self.header[1] >= self.capacity:
+            return False
+        offset = RING_HEADER_SIZE + (head % self.capacity) * RING_SLOT.size
+        length = len(msg)
+        data = (list(msg) + [0, 0, 0])[:3] if length < 3 else msg
+        RING_SLOT.pack_into(self.buf, offset, route, length, data[0], data[1], data[2])
+        self.header[0] = head + 1
+        return True
+
+    def pop(self):
+        tail = self.header[1]
+        if self.header[0] == tail:
+            return None
+        offset = RING_HEADER_SIZE + (tail % self.capacity) * RING_SLOT.size
+        route, length, b0, b1, b2 = RING_SLOT.unpack_from(self.buf, offset)
+        self.header[1] = tail + 1
+        return route, [b0, b1, b2][:length]
+
+    def close(self):
+        self.header.release()
+        self.buf = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class QueueChannel:
+    # Same interface as MessageRing over a multiprocessing queue, for CPUs where the ring is not safe
+    def __init__(self, context, capacity=RING_CAPACITY):
+        self.queue = context.Queue(capacity)
+
+    fits = staticmethod(MessageRing.fits)
+
+    def push(self, route, msg):
+        try:
+            self.queue.put_nowait((route, list(msg)))
+            return True
+        except queue.Full:
+            return False
+
+    def pop(self):
+        try:
+            return self.queue.get_nowait()
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.queue.close()
+
+
+def make_channel(context):
+    return MessageRing() if SHARED_RING_SAFE else QueueChannel(context)
+
+
+class Router:
+    def __init__(self, writer, keystroke_sink=None, tick_interval=ROUTING_TICK):
+        self.writer = writer  # writer(port, msg)
+        self.keystroke_sink = keystroke_sink
+        self.graph = RoutingGraph()
+        self.stats = ConnectionStats(0)
+        self.last_seen = []
+        self.seen_counts = {}
+
+        # Messages arrive one callback at a time, so batched sinks are flushed on a
+        # timer tick rather than per message. tick_interval=None leaves ticking to the caller.
+        self.ticker = None
+        self.ticker_stop = threading.Event()
+        if keystroke_sink is not None and tick_interval is not None:
+            self.ticker = threading.Thread(target=self.run_ticker, args=(tick_interval,), name="routing-tick", daemon=True)
+            self.ticker.start()
+
+    def load(self, graph):
+        self.graph = graph
+        self.load_stats(graph)
+        self.release_removed_keys(graph)
+
+    def release_removed_keys(self, graph):
+        # A held combo would otherwise stay down system-wide once its node is gone
+        if self.keystroke_sink is not None:
+            self.keystroke_sink.release_except(node.keys for node in graph.nodes if node.kind == "keystroke")
+
+    def load_stats(self, graph):
+        # The previous block is left to the garbage collector, a callback may still be recording into it
+        self.stats = ConnectionStats(len(graph.edges))
+        self.last_seen = [0] * len(graph.edges)
+        self.seen_counts = {}  # block -> counts at the previous sample
+
+    def stat_blocks(self):
+        return [self.stats]
+
+    def snapshot(self):
+        # Sums counters across blocks. The value shown only comes from a block that
+        # recorded on that edge since the previous sample, so an idle block (e.g. a
+        # dead shard) never puts its stale value back
+        blocks = self.stat_blocks()
+        snapshot = []
+        for edge in range(len(self.last_seen)):
+            total = 0
+            for block in blocks:
+                seen = self.seen_counts.setdefault(block, [0] * block.size)
+                count = block.counts[edge]
+                total += count
+                if count != seen[edge]:
+                    seen[edge] = count
+                    self.last_seen[edge] = block.last[edge]
+            snapshot.append((total, self.last_seen[edge]))
+        return snapshot
+
+    def has_inputs(self):
+        return bool(self.graph.inputs)
+
+    def wait_ready(self, timeout=None):
+        return True
+
+    def dispatch(self, port, msg):
+        graph = self.graph
+        evaluate(graph, port, msg, lambda index, out: self.emit(graph.nodes[index], out), self.stats)
+
+    def emit(self, node, msg):
+        if node.kind == "keystroke":
+            if self.keystroke_sink is not None:
+                self.keystroke_sink.write(node.keys, msg)
+        else:
+            self.writer(node.port, msg)
+
+    def tick(self):
+        # End of a routing pass - batched sinks write out what it produced
+        if self.keystroke_sink is not None:
+            self.keystroke_sink.flush()
+
+    def run_ticker(self, interval):
+        while not self.ticker_stop.wait(interval):
+            self.tick()
+
+    def close(self):
+        self.ticker_stop.set()
+        if self.ticker is not None:
+            self.ticker.join()
+            self.ticker = None
+        if self.keystroke_sink is not None:
+            self.keystroke_sink.release_all()
+        self.tick()
+
+
+def shard_worker(graph, port, in_ring, out_ring, stats_name, stop_event, ready_event):
+    stats = ConnectionStats(len(graph.edges), stats_name)
+    ready_event.set()
+
+    def emit(index, msg):
+        while not out_ring.push(index, msg):
+            if stop_event.is_set():
+                return
+            time.sleep(0)  # Back-pressure from the writer
+
+    idle = 0
+    while not stop_event.is_set():
+        item = in_ring.pop()
+        if item is None:
+            idle += 1
+            if idle > IDLE_SPINS:
+                time.sleep(IDLE_SLEEP)
+            continue
+        idle = 0
+        evaluate(graph, port, item[1], emit, stats)
+
+    in_ring.close()
+    out_ring.close()
+    stats.close()
+
+
+class Shard:
+    def __init__(self, context, graph, port, stop_event):
+        self.port = port
+        self.alive = True
+        self.lock = threading.Lock()
+        self.in_ring = self.out_ring = self.stats = None
+        try:
+            self.in_ring = make_channel(context)
+            self.out_ring = make_channel(context)
+            self.stats = ConnectionStats(len(graph.edges), shared=True)
+            self.ready = context.Event()
+            self.process = context.Process(
+                target=shard_worker,
+                args=(graph, port, self.in_ring, self.out_ring, self.stats.name, stop_event, self.ready),
+                name=f"midi-shard-{port}",
+                daemon=True
+            )
+            # Fails under spawn if the graph holds an unpicklable UDF (lambda, closure)
+            self.process.start()
+        except Exception:
+            self.close()
+            raise
+
+    def stop(self):
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()  # The rings are drained next, the worker must be gone
+
+    def close(self):
+        for resource in (self.in_ring, self.out_ring, self.stats):
+            if resource is not None:
+                resource.close()
+
+
+class ShardedRouter(Router):
+    # Runs each input port's subgraph in its own worker process. Messages travel
+    # over shared-memory rings and every output write happens on the collector
+    # thread, so output ports keep a single writer.
+    def __init__(self, writer, keystroke_sink=None, context=None):
+        # Each collector pass is a routing tick, no timer needed
+        super().__init__(writer, keystroke_sink, tick_interval=None)
+        self.recovery_stats = ConnectionStats(0)
+        # Never fork - the GUI process already runs Qt, rtmidi and streamer threads.
+        # Process node UDFs therefore have to be picklable (module-level functions).
+        self.context = context or mp.get_context("spawn")
+        self.shards = {}
+        self.stop_event = None
+        self.local = queue.SimpleQueue()  # Output from in-process evaluation
+        self.collector = None
+        self.collecting = False
+
+    def load(self, graph):
+        stop_event = self.context.Event()
+        shards = {}
+        for port in graph.input_ports():
+            try:
+                shards[port] = Shard(self.context, graph, port, stop_event)
+            except Exception as e:
+                print(f"Could not start worker for {port}, routing it in-process: {e}")
+
+        # Publish the new patch before retiring the old one, so dispatch never
+        # pushes into a closed ring
+        self.stop_collector()
+        old_graph, old_shards, old_event = self.graph, self.shards, self.stop_event
+        self.graph = graph
+        self.load_stats(graph)
+        self.shards = shards
+        self.stop_event = stop_event
+        self.retire(old_graph, old_shards, old_event)
+        self.release_removed_keys(graph)
+        self.start_collector()
+
+    def dispatch(self, port, msg):
+        shard = self.shards.get(port)
+        if shard is not None and shard.in_ring.fits(msg):
+            deadline = None
+            while True:
+                with shard.lock:
+                    if not shard.alive:
+                        break
+                    if shard.in_ring.push(0, msg):
+                        return
+                # Ring full - wait for the worker, but never block the callback thread on a stuck UDF
+                if deadline is None:
+                    deadline = time.perf_counter() + DISPATCH_TIMEOUT
+                elif time.perf_counter() > deadline:
+                    break
+                time.sleep(0)
+        self.dispatch_local(port, msg)
+
+    def dispatch_local(self, port, msg, stats=None):
+        graph = self.graph
+        emit = lambda index, out: self.local.put((graph.nodes[index], out))
+        evaluate(graph, port, msg, emit, stats if stats is not None else self.stats)
+
+    def load_stats(self, graph):
+        super().load_stats(graph)
+        # Re-routing after fail-over or reload happens on the collector thread, or on
+        # the GUI thread while the collector is stopped - never on the dispatch thread
+        self.recovery_stats = ConnectionStats(len(graph.edges))
+
+    def start_collector(self):
+        self.collecting = True
+        self.collector = threading.Thread(target=self.collect, name="midi-shard-writer", daemon=True)
+        self.collector.start()
+
+    def stop_collector(self):
+        self.collecting = False
+        if self.collector is not None:
+            # No timeout - the rings must have a single consumer before they are drained here
+            self.collector.join()
+            self.collector = None
+
+    def collect(self):
+        graph = self.graph
+        shards = list(self.shards.values())
+        next_check = time.perf_counter() + HEALTH_CHECK_INTERVAL
+        idle = 0
+        while self.collecting:
+            busy = False
+            for shard in shards:
+                # Bounded per pass so a busy worker can't keep the collector from stopping
+                for _ in range(RING_CAPACITY):
+                    item = shard.out_ring.pop()
+                    if item is None:
+                        break
+                    busy = True
+                    self.write(graph.nodes[item[0]], item[1])
+
+            if not self.local.empty():
+                busy = True
+                self.flush_local()
+
+            now = time.perf_counter()
+            if now >= next_check:
+                next_check = now + HEALTH_CHECK_INTERVAL
+                for shard in shards:
+                    if shard.alive and not shard.process.is_alive():
+                        self.fail_over(shard)
+
+            if busy:
+                self.tick()
+                idle = 0
+            else:
+                idle += 1
+                if idle > IDLE_SPINS:
+                    time.sleep(IDLE_SLEEP)
+
+    def flush_local(self):
+        while not self.local.empty():
+            self.write(*self.local.get())
+
+    def fail_over(self, shard):
+        print(f"Worker for {shard.port} exited with code {shard.process.exitcode}, routing it in-process")
+        with shard.lock:
+            shard.alive = False
+        self.drain(self.graph, shard)
+        self.tick()
+
+    def drain(self, graph, shard):
+        # Flush what the worker finished, then re-route what it never picked up
+        item = shard.out_ring.pop()
+        while item is not None:
+            self.write(graph.nodes[item[0]], item[1])
+            item = shard.out_ring.pop()
+        item = shard.in_ring.pop()
+        while item is not None:
+            self.dispatch_local(shard.port, item[1], self.recovery_stats)
+            item = shard.in_ring.pop()
+
+    def retire(self, graph, shards, stop_event):
+        # Only called with the collector stopped, so this thread is the only writer
+        for shard in shards.values():
+            with shard.lock:
+                shard.alive = False
+        if stop_event is not None:
+            stop_event.set()
+        for shard in shards.values():
+            shard.stop()
+            self.drain(graph, shard)
+            shard.close()
+
+    def wait_ready(self, timeout=None):
+        # Blocks until every worker has booted and attached its rings
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        for shard in list(self.shards.values()):
+            remaining = None if deadline is None else max(0.0, deadline - time.perf_counter())
+            if not shard.ready.wait(remaining):
+                return False
+        return True
+
+    def stat_blocks(self):
+        return [self.stats, self.recovery_stats] + [shard.stats for shard in self.shards.values()]
+
+    def write(self, node, msg):
+        try:
+            self.emit(node, msg)
+        except Exception as e:
+            print(f"Output write to {node.port} failed: {e}")
+
+    def close(self):
+        self.stop_collector()
+        self.retire(self.graph, self.shards, self.stop_event)
+        self.shards = {}
+        self.stop_event = None
+        self.flush_local()
+        if self.keystroke_sink is not None:
+            self.keystroke_sink.release_all()
+        self.tick()
@@ -0,0 +1,123 @@
+import queue
+import re
+import threading
+import time
+
+
+SYSEX_START = 0xF0
+SYSEX_END = 0xF7
+
+SYSEX_BYTES_PER_SECOND = 3125  # DIN MIDI wire speed, 31250 baud / 10 bits per byte
+SYSEX_DISPLAY_BYTES = 16
+SYSEX_MAX_SIZE = 4 * 1024 * 1024
+SYSEX_MESSAGE = re.compile(rb"\xF0[^\xF7]*\xF7")
+
+
+def is_sysex(data):
+    return len(data) > 0 and data[0] == SYSEX_START
+
+
+def split_sysex(data):
+    # Yields each F0..F7 message of a dump (e.g. a patch bank) as a view into it
+    view = memoryview(data)
+    for match in SYSEX_MESSAGE.finditer(view):
+        yield view[match.start():match.end()]
+
+
+def format_sysex(data, limit=SYSEX_DISPLAY_BYTES):
+    # Only the head and the terminating byte are formatted, so a firmware dump
+    # costs the same to display as a short patch message
+    size = len(data)
+    if size <= limit:
+        body = " ".join(f"{b:02X}" for b in data)
+    else:
+        head = " ".join(f"{b:02X}" for b in data[:limit])
+        body = f"{head} ... {data[-1]:02X}"
+    return f"SysEx ({size} bytes): {body}"
+
+
+class SysexAssembler:
+    def __init__(self, max_size=SYSEX_MAX_SIZE):
+        self.max_size = max_size
+        self.buffer = None
+
+    def feed(self, data):
+        # Returns a memoryview over a complete F0..F7 message, or None while a
+        # fragmented dump is still being reassembled
+        view = memoryview(data)
+        if not view:
+            return None
+
+        if view[0] == SYSEX_START:
+            if self.buffer is not None:
+                print(f"SysEx: discarding unterminated message ({len(self.buffer)} bytes)")
+                self.buffer = None
+            if view[-1] == SYSEX_END:
+                # Unfragmented message - hand the caller's buffer straight through
+                return view
+            self.buffer = bytearray(view)
+            return None
+
+        if self.buffer is None:
+            return None  # Continuation without a start byte
+
+        self.buffer += view
+        if len(self.buffer) > self.max_size:
+            print(f"SysEx: message exceeded {self.max_size} bytes, discarding")
+            self.buffer = None
+            return None
+
+        if view[-1] == SYSEX_END:
+            # Hand the buffer over instead of copying it out
+            complete, self.buffer = self.buffer, None
+            return memoryview(complete)
+        return None
+
+    def reset(self):
+        self.buffer = None
+
+
+class SysexStreamer:
+    def __init__(self, send, lock, bytes_per_second=SYSEX_BYTES_PER_SECOND):
+        self.send = send
+        self.lock = lock
+        self.set_rate(bytes_per_second)
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.run, name="sysex-streamer", daemon=True)
+        self.thread.start()
+
+    def set_rate(self, bytes_per_second):
+        self.bytes_per_second = max(1, bytes_per_second)
+
+    def stream(self, data):
+        self.queue.put(memoryview(data))
+
+    def pending(self):
+        return self.queue.qsize()
+
+    def run(self):
+        while True:
+            view = self.queue.get()
+            if view is None:
+                break
+
+            deadline = time.perf_counter()
+            for message in split_sysex(view):
+                # Each F0..F7 message goes out whole under the lock - backends reject
+                # partial SysEx and a status byte mid-dump would terminate it, so
+                # other traffic only interleaves between messages
+                with self.lock:
+                    try:
+                        self.send(message)
+                    except Exception as e:
+                        print(f"SysEx: failed to send {len(message)} byte message: {e}")
+                        break
+
+                deadline += len(message) / self.bytes_per_second
+                delay = deadline - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+    def stop(self):
+        self.queue.put(None)
+        self.thread.join(timeout=1)
@@ -0,0 +1,154 @@
+import time
+import pytest
+import src.keystroke as keystroke
+from src.keystroke import KeystrokeSink, MemoryBackend, format_key_map, key_events, parse_key_map
+from src.routing import Router, RoutingGraph
+
+
+CTRL, SHIFT, S = 29, 42, 31
+KEYS = {36: (CTRL, SHIFT, S), 64: (S,)}
+
+
+def make_router(sink):
+    graph = RoutingGraph()
+    src = graph.add_node("input", "pads")
+    dst = graph.add_node("keystroke", keys=KEYS)
+    graph.connect(src, dst)
+    router = Router(lambda port, msg: None, keystroke_sink=sink, tick_interval=None)
+    router.load(graph)
+    return router
+
+
+def test_press_in_order_release_in_reverse():
+    assert key_events([0x90, 36, 100], KEYS) == [(CTRL, 1), (SHIFT, 1), (S, 1)]
+    assert key_events([0x80, 36, 0], KEYS) == [(S, 0), (SHIFT, 0), (CTRL, 0)]
+
+
+def test_note_on_with_zero_velocity_releases():
+    assert key_events([0x91, 36, 0], KEYS) == [(S, 0), (SHIFT, 0), (CTRL, 0)]
+
+
+def test_unmapped_and_short_messages_are_ignored():
+    assert key_events([0x90, 37, 100], KEYS) == ()
+    assert key_events([0xC0, 36], KEYS) == ()
+
+
+def test_cc_thresholds_at_64():
+    assert key_events([0xB0, 64, 64], KEYS) == [(S, 1)]
+    assert key_events([0xB0, 64, 63], KEYS) == [(S, 0)]
+    assert key_events([0xB0, 64, 127], KEYS) == [(S, 1)]
+    assert key_events([0xB0, 64, 0], KEYS) == [(S, 0)]
+
+
+def test_one_write_per_routing_tick():
+    backend = MemoryBackend()
+    router = make_router(KeystrokeSink(backend))
+
+    router.dispatch("pads", [0x90, 36, 100])
+    router.dispatch("pads", [0x80, 36, 0])
+    router.dispatch("pads", [0x90, 64, 100])
+    assert backend.batches == []
+
+    router.tick()
+    assert len(backend.batches) == 1
+    assert backend.events == [(CTRL, 1), (SHIFT, 1), (S, 1), (S, 0), (SHIFT, 0), (CTRL, 0), (S, 1)]
+
+    router.tick()
+    assert len(backend.batches) == 1
+
+
+def test_ticker_flushes_bursts_in_batches():
+    backend = MemoryBackend()
+    sink = KeystrokeSink(backend)
+    graph = RoutingGraph()
+    graph.connect(graph.add_node("input", "pads"), graph.add_node("keystroke", keys=KEYS))
+    router = Router(lambda port, msg: None, keystroke_sink=sink, tick_interval=0.05)
+    router.load(graph)
+
+    for _ in range(10):
+        router.dispatch("pads", [0x90, 64, 100])
+        router.dispatch("pads", [0x80, 64, 0])
+    router.close()
+
+    assert len(backend.events) == 20
+    assert len(backend.batches) < 20
+
+
+def test_report_rate_and_latency():
+    sink = KeystrokeSink(MemoryBackend())
+    sink.report()
+
+    sink.write(KEYS, [0x90, 36, 100])
+    time.sleep(0.02)
+    sink.flush()
+    sink.write(KEYS, [0x80, 36, 0])
+    sink.flush()
+
+    rate, mean, peak = sink.report()
+    assert rate > 0
+    assert peak >= 20
+    assert mean == pytest.approx(sink.latency_total / 2 * 1000)
+    assert peak >= mean
+
+    rate, mean, peak = sink.report()
+    assert (rate, mean, peak) == (0, 0, 0)
+
+
+def test_key_map_round_trip():
+    keys = parse_key_map("36=29+42+31, 64=31")
+    assert keys == KEYS
+    assert parse_key_map(format_key_map(keys)) == keys
+
+
+def test_key_map_rejects_bad_entries():
+    with pytest.raises(ValueError):
+        parse_key_map("36")
+    with pytest.raises(ValueError):
+        parse_key_map("pad=31")
+
+
+def test_create_backend_falls_back_when_uinput_is_unavailable(monkeypatch):
+    class UInputError(Exception):
+        pass
+
+    def unavailable():
+        raise UInputError('"/dev/uinput" cannot be opened for writing')
+
+    monkeypatch.setattr(keystroke.sys, "platform", "linux")
+    monkeypatch.setattr(keystroke, "UinputBackend", unavailable)
+    assert keystroke.create_backend() is None
+
+
+def test_close_releases_held_keys():
+    backend = MemoryBackend()
+    router = make_router(KeystrokeSink(backend))
+    router.dispatch("pads", [0x90, 36, 100])
+    router.dispatch("pads", [0x90, 64, 100])
+    router.dispatch("pads", [0x80, 64, 0])
+    router.close()
+
+    assert backend.events[-3:] == [(S, 0), (SHIFT, 0), (CTRL, 0)]
+    assert router.keystroke_sink.held == {}
+
+
+def test_reload_releases_keys_of_removed_node_only():
+    backend = MemoryBackend()
+    sink = KeystrokeSink(backend)
+    router = make_router(sink)
+    kept = {48: (S,)}
+    graph = RoutingGraph()
+    src = graph.add_node("input", "pads")
+    graph.connect(src, graph.add_node("keystroke", keys=kept))
+    router.load(graph)
+    router.dispatch("pads", [0x90, 48, 100])
+    router.tick()
+
+    # Original node (KEYS) pressed a combo, then a reload removes it but keeps `kept`
+    sink.write(KEYS, [0x90, 36, 100])
+    router.tick()
+    backend.batches.clear()
+
+    router.load(graph)
+    router.tick()
+    assert backend.events == [(S, 0), (SHIFT, 0), (CTRL, 0)]
+    assert list(sink.held) == [id(kept)]
@@ -0,0 +1,193 @@
+import multiprocessing as mp
+import os
+import signal
+import threading
+import time
+import pytest
+from src.routing import (
+    DISPATCH_TIMEOUT, RING_CAPACITY, ConnectionStats, MessageRing, QueueChannel, Router, RoutingGraph, ShardedRouter,
+    pack_message
+)
+
+
+NOTE_ON = 0x90
+STUCK_NOTE = 127
+
+
+def slow_udf(msg):
+    time.sleep(0.02)
+    return msg
+
+
+def stuck_udf(msg):
+    if msg[1] == STUCK_NOTE:
+        time.sleep(2)
+    return msg
+
+
+def build_patch(func=None):
+    graph = RoutingGraph()
+    src = graph.add_node("input", "pads")
+    process = graph.add_node("process", func=func)
+    dst = graph.add_node("output", "out")
+    graph.connect(src, process)
+    graph.connect(process, dst)
+    return graph
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def pop_wait(channel, timeout=1):
+    # multiprocessing queues hand items over through a feeder thread
+    deadline = time.perf_counter() + timeout
+    item = channel.pop()
+    while item is None and time.perf_counter() < deadline:
+        time.sleep(0.005)
+        item = channel.pop()
+    return item
+
+
+@pytest.fixture
+def router():
+    received = []
+    router = ShardedRouter(lambda port, msg: received.append(list(msg)))
+    router.received = received
+    yield router
+    router.close()
+
+
+def test_ring_push_pop_and_wrap_around():
+    ring = MessageRing(capacity=4)
+    try:
+        for round_ in range(3):
+            for i in range(3):
+                assert ring.push(i, [NOTE_ON, round_, i])
+            for i in range(3):
+                assert ring.pop() == (i, [NOTE_ON, round_, i])
+            assert ring.pop() is None
+        assert ring.push(7, [0xC0, 5])
+        assert ring.pop() == (7, [0xC0, 5])
+    finally:
+        ring.close()
+
+
+def test_ring_rejects_push_when_full():
+    ring = MessageRing(capacity=4)
+    try:
+        for i in range(4):
+            assert ring.push(0, [NOTE_ON, i, 1])
+        assert not ring.push(0, [NOTE_ON, 4, 1])
+        assert ring.pop() == (0, [NOTE_ON, 0, 1])
+        assert ring.push(0, [NOTE_ON, 4, 1])
+    finally:
+        ring.close()
+
+
+def test_queue_channel_matches_ring():
+    ring = MessageRing(capacity=4)
+    channel = QueueChannel(mp.get_context("spawn"), capacity=4)
+    try:
+        messages = [(1, [NOTE_ON, 60, 100]), (2, [0xC0, 5]), (3, [0xF8]), (4, [0x80, 60, 0])]
+        for route, msg in messages:
+            assert ring.push(route, msg) == channel.push(route, msg) == True
+        assert ring.push(5, [0xF8]) == channel.push(5, [0xF8]) == False
+        for _ in messages:
+            assert pop_wait(channel) == ring.pop()
+        assert ring.pop() is None and channel.pop() is None
+    finally:
+        ring.close()
+        channel.close()
+
+
+def test_fail_over_reroutes_queued_input(router):
+    router.load(build_patch(slow_udf))
+    assert router.wait_ready(timeout=30)
+
+    for i in range(20):
+        router.dispatch("pads", [NOTE_ON, i, 100])
+    shard = router.shards["pads"]
+    os.kill(shard.process.pid, signal.SIGKILL)
+    assert wait_for(lambda: not shard.alive)
+
+    for i in range(20, 25):
+        router.dispatch("pads", [NOTE_ON, i, 100])
+    assert wait_for(lambda: len(router.received) >= 24)
+
+    notes = [msg[1] for msg in router.received]
+    # At most the message the worker was evaluating when killed is lost
+    assert len(set(range(20)) - set(notes)) <= 1
+    assert set(range(20, 25)) <= set(notes)
+
+
+def test_load_on_live_router_drops_nothing(router):
+    router.load(build_patch())
+    assert router.wait_ready(timeout=30)
+
+    count = 5000
+    def feed():
+        for i in range(count):
+            router.dispatch("pads", [NOTE_ON, i % 128, 100])
+
+    feeder = threading.Thread(target=feed)
+    feeder.start()
+    for _ in range(2):
+        router.load(build_patch())
+    feeder.join()
+
+    assert wait_for(lambda: len(router.received) == count, timeout=30)
+
+
+def test_dispatch_falls_back_when_worker_is_stuck(router):
+    router.load(build_patch(stuck_udf))
+    assert router.wait_ready(timeout=30)
+
+    router.dispatch("pads", [NOTE_ON, STUCK_NOTE, 100])
+    time.sleep(0.2)  # Let the worker pick it up and block
+    for _ in range(RING_CAPACITY):
+        router.dispatch("pads", [NOTE_ON, 1, 100])
+
+    start = time.perf_counter()
+    router.dispatch("pads", [NOTE_ON, 2, 100])
+    assert time.perf_counter() - start >= DISPATCH_TIMEOUT
+    assert wait_for(lambda: [NOTE_ON, 2, 100] in router.received, timeout=1)
+
+
+def shared_memory_segments():
+    return {name for name in os.listdir("/dev/shm") if name.startswith("psm_")}
+
+
+def test_failed_worker_start_releases_shared_memory(router):
+    before = shared_memory_segments() if os.path.isdir("/dev/shm") else None
+    router.load(build_patch(lambda msg: msg))  # Lambdas can't be pickled for spawn
+
+    assert router.shards == {}
+    router.dispatch("pads", [NOTE_ON, 60, 100])
+    assert wait_for(lambda: router.received == [[NOTE_ON, 60, 100]])
+    if before is not None:
+        assert shared_memory_segments() - before == set()
+
+
+def test_snapshot_ignores_stale_value_from_idle_block():
+    router = Router(lambda port, msg: None)
+    router.load(build_patch())
+    dead_shard = ConnectionStats(2)
+    router.stat_blocks = lambda: [router.stats, dead_shard]
+
+    dead_shard.record(1, [NOTE_ON, 60, 100])
+    assert router.snapshot()[1] == (1, pack_message([NOTE_ON, 60, 100]))
+
+    # Note-off re-routed in-process lands in the other block, which is iterated first
+    router.dispatch("pads", [0x80, 60, 0])
+    for _ in range(3):
+        assert router.snapshot()[1] == (2, pack_message([0x80, 60, 0]))
+
+    # A block that records again takes over, even with a value it held before
+    dead_shard.record(1, [NOTE_ON, 60, 100])
+    assert router.snapshot()[1] == (3, pack_message([NOTE_ON, 60, 100]))
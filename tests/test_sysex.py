@@ -0,0 +1,75 @@
+import threading
+import time
+from src.sysex import SysexAssembler, SysexStreamer, format_sysex, split_sysex
+
+
+def test_unfragmented_message_passes_through_without_copy():
+    data = bytearray(b"\xf0\x43\x10\xf7")
+    view = SysexAssembler().feed(data)
+    assert view.obj is data
+
+
+def test_fragmented_message_is_reassembled():
+    assembler = SysexAssembler()
+    assert assembler.feed(b"\xf0\x01\x02") is None
+    assert assembler.feed(b"\x03\x04") is None
+    assert bytes(assembler.feed(b"\x05\xf7")) == b"\xf0\x01\x02\x03\x04\x05\xf7"
+    assert assembler.buffer is None
+
+
+def test_orphan_continuation_is_ignored():
+    assembler = SysexAssembler()
+    assert assembler.feed(b"\x01\x02\xf7") is None
+    assert bytes(assembler.feed(b"\xf0\x7e\xf7")) == b"\xf0\x7e\xf7"
+
+
+def test_overflow_discards_message():
+    assembler = SysexAssembler(max_size=8)
+    assembler.feed(b"\xf0\x01\x02\x03")
+    assert assembler.feed(b"\x04\x05\x06\x07\x08") is None
+    assert assembler.buffer is None
+    assert assembler.feed(b"\x09\xf7") is None
+
+
+def test_new_start_replaces_unterminated_message():
+    assembler = SysexAssembler()
+    assembler.feed(b"\xf0\x01")
+    assert bytes(assembler.feed(b"\xf0\x02\xf7")) == b"\xf0\x02\xf7"
+
+
+def test_format_truncates_long_dumps():
+    text = format_sysex(b"\xf0" + bytes(100) + b"\xf7", limit=4)
+    assert text == "SysEx (102 bytes): F0 00 00 00 ... F7"
+
+
+def test_split_yields_views_of_each_message():
+    dump = b"\xf0\x01\xf7\xf0\x02\x03\xf7"
+    assert [bytes(m) for m in split_sysex(dump)] == [b"\xf0\x01\xf7", b"\xf0\x02\x03\xf7"]
+
+
+def test_streamer_sends_whole_messages_paced_by_rate():
+    sent = []
+    done = threading.Event()
+
+    def send(message):
+        sent.append((time.perf_counter(), bytes(message)))
+        if len(sent) == 2:
+            done.set()
+
+    streamer = SysexStreamer(send, threading.Lock(), bytes_per_second=1000)
+    start = time.perf_counter()
+    streamer.stream(b"\xf0" + bytes(98) + b"\xf7" + b"\xf0\x01\xf7")
+    assert done.wait(timeout=2)
+    streamer.stop()
+
+    assert [len(message) for _, message in sent] == [100, 3]
+    assert all(message[0] == 0xF0 and message[-1] == 0xF7 for _, message in sent)
+    assert sent[1][0] - start >= 0.09
+
+
+def test_streamer_clamps_zero_rate():
+    sent = threading.Event()
+    streamer = SysexStreamer(lambda message: sent.set(), threading.Lock(), bytes_per_second=0)
+    assert streamer.bytes_per_second == 1
+    streamer.stream(b"\xf0\x01\xf7")
+    assert sent.wait(timeout=1)